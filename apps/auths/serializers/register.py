@@ -1,7 +1,9 @@
+from django.db.models import Q
 from rest_framework import serializers
 from apps.users.models import User
+from apps.users.serializers import CachedFieldsModelSerializer
 
-class RegisterSerializer(serializers.ModelSerializer):
+class RegisterSerializer(CachedFieldsModelSerializer):
     password = serializers.CharField(max_length=128, min_length=8, write_only=True, required=True)
     confirm_password = serializers.CharField(max_length=128, min_length=8, write_only=True, required=True)
     role = serializers.ChoiceField(choices=User.ROLE_CHOICES, required=True)
@@ -13,22 +15,28 @@ class RegisterSerializer(serializers.ModelSerializer):
             'first_name', 'last_name', 'email', 'username',
             'password', 'confirm_password', 'role', 'bio'
         ]
-
-    def validate_email(self, value):
-        """Check if email already exists"""
-        if User.objects.filter(email=value).exists():
-            raise serializers.ValidationError("A user with this email already exists.")
-        return value
-
-    def validate_username(self, value):
-        """Check if username already exists"""
-        if User.objects.filter(username=value).exists():
-            raise serializers.ValidationError("A user with this username already exists.")
-        return value
+        # Uniqueness is checked with a single query in validate()
+        extra_kwargs = {
+            'email': {'validators': []},
+            'username': {'validators': []},
+        }
 
     def validate(self, attrs):
         if attrs['password'] != attrs['confirm_password']:
             raise serializers.ValidationError("Passwords don't match")
+
+        clashes = User.objects.filter(
+            Q(email=attrs['email']) | Q(username=attrs['username'])
+        ).values_list('email', 'username')
+
+        errors = {}
+        for email, username in clashes:
+            if email == attrs['email']:
+                errors['email'] = "A user with this email already exists."
+            if username == attrs['username']:
+                errors['username'] = "A user with this username already exists."
+        if errors:
+            raise serializers.ValidationError(errors)
         return attrs
 
     def create(self, validated_data):
@@ -36,4 +44,4 @@ class RegisterSerializer(serializers.ModelSerializer):
         # Handle empty bio
         if not validated_data.get('bio'):
             validated_data['bio'] = ''
-        return User.objects.create_user(**validated_data)
\ No newline at end of file
+        return User.objects.create_user(**validated_data)
@@ -0,0 +1,33 @@
+import logging
+from collections import Counter
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# A statement running more often than this in one request is reported as an N+1
+QUERY_SNITCH_THRESHOLD = 1
+
+
+class QuerySnitchMiddleware:
+    """Development only: flag responses whose request repeated the same SQL statement"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        statements = Counter()
+
+        def record(execute, sql, params, many, context):
+            # Parameters are left out so per-row lookups collapse onto one statement
+            statements[sql] += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            response = self.get_response(request)
+
+        repeated = {sql: count for sql, count in statements.items() if count > QUERY_SNITCH_THRESHOLD}
+        if repeated:
+            response['X-Query-Snitch-Detected'] = 'true'
+            for sql, count in repeated.items():
+                logger.warning("N+1 on %s %s: ran %d times: %s", request.method, request.path, count, sql)
+        return response
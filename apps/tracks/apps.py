@@ -5,3 +5,6 @@ class TracksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.tracks'
     label = 'apps_tracks'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,13 @@
+from django.contrib.postgres.search import SearchQuery
+from rest_framework import filters
+
+
+class TrackSearchFilter(filters.SearchFilter):
+    """?search= against the GIN-indexed Track.search_vector instead of ILIKE on each search field"""
+
+    def filter_queryset(self, request, queryset, view):
+        terms = request.query_params.get(self.search_param, '').strip()
+        if not terms:
+            return queryset
+        # websearch syntax: quoted phrases, "or" and -exclusions, never a syntax error
+        return queryset.filter(search_vector=SearchQuery(terms, search_type='websearch'))
@@ -0,0 +1,59 @@
+# apps/tracks/management/commands/backfill_track_fields.py
+from django.core.management.base import BaseCommand
+from django.db.models import F
+from apps.tracks.models import Track, TRACK_SEARCH_VECTOR
+from apps.tracks.utils.response_cache import invalidate_track_responses
+
+# Bitrates used to be stored in bps. No real file reaches 32000 kbps, while 32 kbps (the lowest
+# common MP3 rate) is 32000 bps, so anything at or above this is still in bps
+LEGACY_BPS_THRESHOLD = 32000
+
+# Denormalized columns Track.save() maintains; rows written before they existed need one pass
+DERIVED_FIELDS = ['tags_array', 'duration_formatted', 'artist_username', 'artist_full_name']
+
+
+class Command(BaseCommand):
+    help = 'Fill derived track columns and the search vector for existing rows (run once after migrating)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Tracks loaded and written per batch',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.stdout.write('🔧 Backfilling derived track fields...')
+
+        tracks = Track.objects.select_related('artist').only(
+            'id', 'tags', 'duration', 'artist__username', 'artist__first_name', 'artist__last_name',
+            *DERIVED_FIELDS
+        ).order_by('pk')
+
+        # bulk_update skips save() and its signals: no audio reprocessing, no per-row cache flush
+        batch = []
+        total = 0
+        for track in tracks.iterator(chunk_size=batch_size):
+            track.derive_display_fields()
+            batch.append(track)
+            if len(batch) >= batch_size:
+                Track.objects.bulk_update(batch, DERIVED_FIELDS)
+                total += len(batch)
+                batch = []
+        if batch:
+            Track.objects.bulk_update(batch, DERIVED_FIELDS)
+            total += len(batch)
+        self.stdout.write(f'  ✅ {total} track(s) updated')
+
+        self.stdout.write('🎚️  Converting legacy bitrates from bps to kbps...')
+        converted = Track.objects.filter(bitrate__gte=LEGACY_BPS_THRESHOLD).update(bitrate=F('bitrate') / 1000)
+        self.stdout.write(f'  ✅ {converted} track(s) converted')
+
+        # The search document reads artist_username, so rebuild it after the names are in place
+        self.stdout.write('🔎 Rebuilding search vectors...')
+        Track.objects.update(search_vector=TRACK_SEARCH_VECTOR)
+        invalidate_track_responses()
+
+        self.stdout.write(self.style.SUCCESS('✅ Track backfill completed'))
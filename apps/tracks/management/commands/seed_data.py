@@ -1,11 +1,14 @@
 # apps/tracks/management/commands/seed_data.py
 from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
 from django.utils.text import slugify
 from apps.tracks.models import Genre, Mood, LicenseType
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+SAMPLE_PASSWORD = 'testpass123'  # Simple password for demo
+
 
 class Command(BaseCommand):
     help = 'Populate database with initial data for RiffRent'
@@ -95,17 +98,16 @@ class Command(BaseCommand):
             }
         ]
 
-        created_count = 0
-        for genre_data in genres_data:
-            genre, created = Genre.objects.get_or_create(
+        existing_names = set(Genre.objects.values_list('name', flat=True))
+        created_count = len(Genre.objects.bulk_create([
+            Genre(
                 name=genre_data['name'],
-                defaults={
-                    'slug': slugify(genre_data['name']),
-                    'description': genre_data['description']
-                }
+                slug=slugify(genre_data['name']),
+                description=genre_data['description']
             )
-            if created:
-                created_count += 1
+            for genre_data in genres_data
+            if genre_data['name'] not in existing_names
+        ]))
 
         self.stdout.write(f'  ✅ Created {created_count} genres')
 
@@ -176,17 +178,16 @@ class Command(BaseCommand):
             }
         ]
 
-        created_count = 0
-        for mood_data in moods_data:
-            mood, created = Mood.objects.get_or_create(
+        existing_names = set(Mood.objects.values_list('name', flat=True))
+        created_count = len(Mood.objects.bulk_create([
+            Mood(
                 name=mood_data['name'],
-                defaults={
-                    'slug': slugify(mood_data['name']),
-                    'description': mood_data['description']
-                }
+                slug=slugify(mood_data['name']),
+                description=mood_data['description']
             )
-            if created:
-                created_count += 1
+            for mood_data in moods_data
+            if mood_data['name'] not in existing_names
+        ]))
 
         self.stdout.write(f'  ✅ Created {created_count} moods')
 
@@ -237,14 +238,12 @@ class Command(BaseCommand):
             }
         ]
 
-        created_count = 0
-        for license_info in license_data:
-            license_type, created = LicenseType.objects.get_or_create(
-                name=license_info['name'],
-                defaults=license_info
-            )
-            if created:
-                created_count += 1
+        existing_names = set(LicenseType.objects.values_list('name', flat=True))
+        created_count = len(LicenseType.objects.bulk_create([
+            LicenseType(**license_info)
+            for license_info in license_data
+            if license_info['name'] not in existing_names
+        ]))
 
         self.stdout.write(f'  ✅ Created {created_count} license types')
 
@@ -301,20 +300,24 @@ class Command(BaseCommand):
         ]
 
         all_users = artists_data + buyers_data
-        created_count = 0
+        existing_emails = set(
+            User.objects.filter(
+                email__in=[user_data['email'] for user_data in all_users]
+            ).values_list('email', flat=True)
+        )
 
-        for user_data in all_users:
-            if not User.objects.filter(email=user_data['email']).exists():
-                user = User.objects.create_user(
-                    username=user_data['username'],
-                    email=user_data['email'],
-                    password='testpass123',  # Simple password for demo
-                    first_name=user_data['first_name'],
-                    last_name=user_data['last_name'],
-                    role=user_data['role'],
-                    bio=user_data['bio']
-                )
-                created_count += 1
+        missing_users = [
+            user_data for user_data in all_users
+            if user_data['email'] not in existing_emails
+        ]
+
+        created_count = 0
+        if missing_users:
+            # Hash the shared demo password once instead of once per user
+            password = make_password(SAMPLE_PASSWORD)
+            created_count = len(User.objects.bulk_create([
+                User(password=password, **user_data) for user_data in missing_users
+            ]))
 
         self.stdout.write(f'  ✅ Created {created_count} sample users')
-        self.stdout.write('  📝 Sample user credentials: password = "testpass123"')
\ No newline at end of file
+        self.stdout.write(f'  📝 Sample user credentials: password = "{SAMPLE_PASSWORD}"')
\ No newline at end of file
@@ -1,20 +1,24 @@
 import uuid
 import os
+import logging
+from django.core.cache import cache
 from django.db import models
+from django.db.models import F, Q
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
-from mutagen import File as MutagenFile
-from mutagen.mp3 import MP3
-from mutagen.mp4 import MP4
-from mutagen.flac import FLAC
-from django.core.files.base import ContentFile
-from pydub import AudioSegment
-from pydub.utils import make_chunks
+from mutagen import File as MutagenFile, MutagenError
+from django.core.files import File
+import ffmpeg
 import tempfile
 
 
 User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
 
 def track_upload_path(instance, filename):
     """Generate upload path for track files"""
@@ -109,6 +113,40 @@ class LicenseType(models.Model):
         return self.display_name
 
 
+# Shared by every worker so displayed and charged prices come from the same copy;
+# signals delete it on any LicenseType write and the timeout bounds anything missed
+ACTIVE_LICENSE_TYPES_CACHE_KEY = 'metadata:active_license_types'
+ACTIVE_LICENSE_TYPES_CACHE_TIMEOUT = 300
+
+
+def active_license_types():
+    """Return active license types as {name: (price_multiplier, id)}, shared through the cache"""
+    return cache.get_or_set(
+        ACTIVE_LICENSE_TYPES_CACHE_KEY,
+        lambda: {
+            row['name']: (row['price_multiplier'], row['id'])
+            for row in LicenseType.objects.filter(is_active=True).values('name', 'price_multiplier', 'id')
+        },
+        ACTIVE_LICENSE_TYPES_CACHE_TIMEOUT
+    )
+
+
+# Fields that make up Track.search_vector, weighted by how strongly a match should count
+TRACK_SEARCH_FIELDS = ('title', 'artist_username', 'tags', 'description')
+TRACK_SEARCH_VECTOR = (
+    SearchVector('title', weight='A')
+    + SearchVector('artist_username', weight='A')
+    + SearchVector('tags', weight='B')
+    + SearchVector('description', weight='C')
+)
+
+
+def active_license_type_id(name):
+    """Return the primary key of the active license type called name, or None"""
+    license_info = active_license_types().get(name)
+    return license_info[1] if license_info else None
+
+
 class Track(models.Model):
     """Main track model for uploaded audio files"""
 
@@ -129,6 +167,9 @@ class Track(models.Model):
     public_id = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
     title = models.CharField(max_length=200)
     artist = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tracks')
+    # Copied from artist so list endpoints need no join; kept in sync on save and by signals
+    artist_username = models.CharField(max_length=255, blank=True, editable=False)
+    artist_full_name = models.CharField(max_length=511, blank=True, editable=False)
     description = models.TextField(max_length=1000, blank=True)
 
     # Audio Files
@@ -157,10 +198,31 @@ class Track(models.Model):
         blank=True,
         help_text="Comma-separated tags (e.g., guitar, upbeat, summer)"
     )
+    tags_array = ArrayField(
+        models.CharField(max_length=500),
+        default=list,
+        blank=True,
+        editable=False,
+        help_text="Parsed tags, kept in sync with tags on save"
+    )
+
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        help_text="Full-text document over title, artist, tags and description, kept in sync by signals"
+    )
 
     # Audio Properties (auto-filled from file)
-    duration = models.PositiveIntegerField(null=True, blank=True, help_text="Duration in seconds")
+    duration = models.PositiveSmallIntegerField(null=True, blank=True, help_text="Duration in seconds")
+    duration_formatted = models.CharField(
+        max_length=16,
+        default="Unknown",
+        editable=False,
+        help_text="Duration in MM:SS format, kept in sync with duration on save"
+    )
     file_size = models.PositiveIntegerField(null=True, blank=True, help_text="File size in bytes")
+    # Integer, not smallint: rows written before the switch to kbps hold raw bps (e.g. 320000)
+    # until backfill_track_fields converts them
     bitrate = models.PositiveIntegerField(null=True, blank=True, help_text="Bitrate in kbps")
     sample_rate = models.PositiveIntegerField(null=True, blank=True, help_text="Sample rate in Hz")
 
@@ -201,69 +263,103 @@ class Track(models.Model):
 
     class Meta:
         ordering = ['-uploaded_at']
+        # The public catalogue only ever reads approved tracks, newest first, so its
+        # indexes are partial on that status (the genre/mood FKs keep their own indexes)
         indexes = [
-            models.Index(fields=['status']),
-            models.Index(fields=['genre']),
-            models.Index(fields=['artist']),
-            models.Index(fields=['is_featured']),
+            models.Index(
+                fields=['-uploaded_at'], name='track_approved_time_idx',
+                condition=Q(status='approved')
+            ),
+            models.Index(
+                fields=['is_featured', '-uploaded_at'], name='track_approved_feat_idx',
+                condition=Q(status='approved')
+            ),
+            models.Index(
+                fields=['genre', '-uploaded_at'], name='track_approved_genre_idx',
+                condition=Q(status='approved')
+            ),
+            models.Index(
+                fields=['mood', '-uploaded_at'], name='track_approved_mood_idx',
+                condition=Q(status='approved')
+            ),
+            models.Index(fields=['artist', '-uploaded_at'], name='track_artist_time_idx'),
+            GinIndex(fields=['tags_array'], name='track_tags_gin_idx'),
+            GinIndex(fields=['search_vector'], name='track_search_gin_idx'),
         ]
 
     def __str__(self):
         return f"{self.title} by {self.artist.username}"
 
     def save(self, *args, **kwargs):
-        """Ovrride save to extract metadata and generate preview"""
-        is_new = not self.pk
+        """Override save to derive display fields (audio processing runs in the background, see signals)"""
+        update_fields = kwargs.get('update_fields')
+
+        # Derive display values once here instead of on every serialization
+        self.derive_display_fields(include_artist=update_fields is None or 'artist' in update_fields)
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if 'tags' in update_fields:
+                update_fields.add('tags_array')
+            if 'duration' in update_fields:
+                update_fields.add('duration_formatted')
+            if 'artist' in update_fields:
+                update_fields.update(['artist_username', 'artist_full_name'])
+            kwargs['update_fields'] = update_fields
 
-        """Override save to extract audio metadata"""
-        if not self.pk or 'audio_file' in kwargs.get('update_fields', []):
-            self._extract_audio_metadata()
         super().save(*args, **kwargs)
 
-        if is_new or not self.preview_file:
-            self._generate_preview()
-            super().save(update_fields=['preview_file'])
+    def derive_display_fields(self, include_artist=True):
+        """Fill the denormalized display columns from tags, duration and (optionally) the artist"""
+        self.tags_array = [tag.strip() for tag in (self.tags or '').split(',') if tag.strip()]
+        self.duration_formatted = (
+            f"{self.duration // 60}:{self.duration % 60:02d}" if self.duration else "Unknown"
+        )
+        if include_artist:
+            self.artist_username = self.artist.username
+            self.artist_full_name = self.artist.full_name
 
     def _generate_preview(self):
         if not self.audio_file:
             return
 
         try:
-            # Load the audio file
-            audio = AudioSegment.from_file(self.audio_file.path)
-
-            # Calculate preview start time (middle of track or beginning)
-            duration_ms = len(audio)
-            preview_duration_ms = 30 * 1000  # 30 seconds in milliseconds
+            # Calculate preview start time from the duration mutagen already read
+            preview_duration = 30  # seconds
+            start_time = 0
 
-            if duration_ms > preview_duration_ms:
+            if self.duration and self.duration > preview_duration:
                 # Start preview from 1/4 into the track (usually where the good part is)
-                start_time = duration_ms // 4
-                preview = audio[start_time:start_time + preview_duration_ms]
-            else:
-                # If track is shorter than 30s, use the whole track
-                preview = audio
+                start_time = self.duration // 4
+            # If track is shorter than 30s, ffmpeg simply stops at the end
 
-            # Export preview to temporary file
             with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_file:
-                preview.export(temp_file.name, format="mp3", bitrate="128k")
-
-                # Read the temporary file and save to preview_file field
-                with open(temp_file.name, 'rb') as f:
-                    preview_content = f.read()
-
-                preview_filename = f"preview_{self.public_id}.mp3"
-                self.preview_file.save(
-                    preview_filename,
-                    ContentFile(preview_content),
-                    save=False  # Don't save the model again
+                temp_path = temp_file.name
+
+            try:
+                # Seek on the input so ffmpeg only decodes and encodes the preview window
+                (
+                    ffmpeg
+                    .input(self.audio_file.path, ss=start_time, t=preview_duration)
+                    .output(temp_path, format='mp3', acodec='libmp3lame', audio_bitrate='128k')
+                    .overwrite_output()
+                    .run(quiet=True)
                 )
 
+                # Hand the open file to storage so it is copied in chunks, not read into memory
+                with open(temp_path, 'rb') as f:
+                    preview_filename = f"preview_{self.public_id}.mp3"
+                    self.preview_file.save(
+                        preview_filename,
+                        File(f),
+                        save=False  # Don't save the model again
+                    )
+            finally:
                 # Clean up temporary file
-                os.unlink(temp_file.name)
+                os.unlink(temp_path)
 
-        except Exception as e:
-            print(f"Error generating preview for {self.title}: {e}")
+        except (ffmpeg.Error, OSError):
+            # Keep the upload; the track has no preview until generate_missing_previews retries it
+            logger.exception("Error generating preview for track %s", self.pk)
 
     def _extract_audio_metadata(self):
         """Extract metadata from uploaded audio file"""
@@ -271,38 +367,23 @@ class Track(models.Model):
             return
 
         try:
-            # Try with pydub first (more reliable)
-            audio = AudioSegment.from_file(self.audio_file.path)
-            self.duration = int(len(audio) / 1000)  # Convert ms to seconds
             self.file_size = self.audio_file.size
 
-            # Try to get more detailed info with mutagen
-            audio_file = MutagenFile(self.audio_file.path)
+            # Read the headers once with mutagen, through the storage file object
+            audio_file = MutagenFile(self.audio_file.file)
             if audio_file is not None:
-                if isinstance(audio_file, (MP3, MP4)):
-                    if hasattr(audio_file.info, 'bitrate'):
-                        self.bitrate = audio_file.info.bitrate
-                    if hasattr(audio_file.info, 'sample_rate'):
-                        self.sample_rate = audio_file.info.sample_rate
-
-        except Exception as e:
-            print(f"Error extracting metadata for {self.title}: {e}")
+                self.duration = int(audio_file.info.length)
+                bitrate = getattr(audio_file.info, 'bitrate', None)
+                self.bitrate = bitrate // 1000 if bitrate else None  # bps to kbps
+                self.sample_rate = getattr(audio_file.info, 'sample_rate', None)
 
-    @property
-    def duration_formatted(self):
-        """Return duration in MM:SS format"""
-        if not self.duration:
-            return "Unknown"
-        minutes = self.duration // 60
-        seconds = self.duration % 60
-        return f"{minutes}:{seconds:02d}"
+        except MutagenError:
+            logger.warning("Error extracting metadata for track %s", self.pk, exc_info=True)
 
     @property
     def tag_list(self):
         """Return tags as a list"""
-        if not self.tags:
-            return []
-        return [tag.strip() for tag in self.tags.split(',') if tag.strip()]
+        return self.tags_array
 
     @property
     def is_available(self):
@@ -311,19 +392,10 @@ class Track(models.Model):
 
     def get_license_price(self, license_type):
         """Calculate price for specific license type"""
-        try:
-            license_obj = LicenseType.objects.get(name=license_type, is_active=True)
-            return self.base_price * license_obj.price_multiplier
-        except LicenseType.DoesNotExist:
+        license_info = active_license_types().get(license_type)
+        if license_info is None:
             return self.base_price
-
-    def increment_play_count(self):
-        self.play_count += 1
-        self.save(update_fields=['play_count'])
-
-    def increment_purchase_count(self):
-        self.purchase_count += 1
-        self.save(update_fields=['purchase_count'])
+        return self.base_price * license_info[0]
 
 
 class Purchase(models.Model):
@@ -383,9 +455,12 @@ class Purchase(models.Model):
         return self.payment_status == 'succeeded' and self.download_count < self.max_downloads
 
     def increment_download_count(self):
-        """Increment download count"""
-        if self.can_download:
+        """Increment download count if the purchase still allows it"""
+        updated = Purchase.objects.filter(
+            pk=self.pk,
+            payment_status='succeeded',
+            download_count__lt=F('max_downloads')
+        ).update(download_count=F('download_count') + 1)
+        if updated:
             self.download_count += 1
-            self.save(update_fields=['download_count'])
-            return True
-        return False
+        return bool(updated)
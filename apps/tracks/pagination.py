@@ -0,0 +1,17 @@
+from rest_framework.pagination import CursorPagination
+
+
+class TrackCursorPagination(CursorPagination):
+    """Keyset pagination over the approved-track uploaded_at indexes, no OFFSET scans"""
+    page_size = 25
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = '-uploaded_at'
+
+
+class PurchaseCursorPagination(CursorPagination):
+    """Keyset pagination for a buyer's purchases, newest first"""
+    page_size = 25
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    ordering = '-purchased_at'
@@ -1,5 +1,7 @@
+import os
 from rest_framework import serializers
 from .models import Track, Genre, Mood, LicenseType, Purchase
+from .utils.metadata_cache import active_license_multipliers
 
 
 class GenreSerializer(serializers.ModelSerializer):
@@ -29,12 +31,11 @@ class LicenseTypeSerializer(serializers.ModelSerializer):
 
 class TrackListSerializer(serializers.ModelSerializer):
     """Serializer for track list view (minimal data)"""
-    artist_name = serializers.CharField(source='artist.username', read_only=True)
-    artist_full_name = serializers.CharField(source='artist.full_name', read_only=True)
+    artist_name = serializers.CharField(source='artist_username', read_only=True)
     genre_name = serializers.CharField(source='genre.name', read_only=True)
     mood_name = serializers.CharField(source='mood.name', read_only=True)
     duration_formatted = serializers.ReadOnlyField()
-    tag_list = serializers.ReadOnlyField()
+    tag_list = serializers.ReadOnlyField(source='tags_array')
     
     class Meta:
         model = Track
@@ -44,9 +45,62 @@ class TrackListSerializer(serializers.ModelSerializer):
             'cover_image', 'preview_file', 'tag_list', 'play_count',
             'is_featured', 'uploaded_at'
         ]
+        # Relations read through source=..., mapped to the fields that need them and joined
+        # by the views (artist names are denormalized)
+        select_related = {
+            'genre': ('genre_name',),
+            'mood': ('mood_name',),
+        }
+
+
+def requested_fields(request):
+    """Field names from ?fields=a,b,c, or None when the client wants every field"""
+    if request is None or not request.query_params.get('fields'):
+        return None
+    return {name.strip() for name in request.query_params['fields'].split(',')}
+
+
+class SparseFieldsMixin:
+    """Only build the fields listed in ?fields=, so unrequested method fields are never computed.
+
+    Meta.select_related maps each relation to the fields that read it and
+    Meta.context_loaders maps a context key to (field names, loader); views
+    call optimize_queryset() and preload_context() instead of listing joins.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = requested_fields(self.context.get('request'))
+        if requested is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in requested}
+
+    @classmethod
+    def select_related_for(cls, request):
+        """Relations from Meta.select_related that the requested fields actually read"""
+        requested = requested_fields(request)
+        return [
+            relation for relation, field_names in cls.Meta.select_related.items()
+            if requested is None or requested.intersection(field_names)
+        ]
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request):
+        """Join every relation the requested fields read"""
+        return queryset.select_related(*cls.select_related_for(request))
+
+    @classmethod
+    def preload_context(cls, request):
+        """Load each Meta.context_loaders value once per request, when its fields are requested"""
+        requested = requested_fields(request)
+        return {
+            key: loader()
+            for key, (field_names, loader) in getattr(cls.Meta, 'context_loaders', {}).items()
+            if requested is None or requested.intersection(field_names)
+        }
 
 
-class TrackDetailSerializer(serializers.ModelSerializer):
+class TrackDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for detailed track view"""
     artist_name = serializers.CharField(source='artist.username', read_only=True)
     artist_full_name = serializers.CharField(source='artist.full_name', read_only=True)
@@ -54,7 +108,7 @@ class TrackDetailSerializer(serializers.ModelSerializer):
     genre = GenreSerializer(read_only=True)
     mood = MoodSerializer(read_only=True)
     duration_formatted = serializers.ReadOnlyField()
-    tag_list = serializers.ReadOnlyField()
+    tag_list = serializers.ReadOnlyField(source='tags_array')
     license_prices = serializers.SerializerMethodField()
     
     class Meta:
@@ -67,16 +121,32 @@ class TrackDetailSerializer(serializers.ModelSerializer):
             'cover_image', 'preview_file', 'play_count', 'purchase_count',
             'is_featured', 'is_exclusive', 'uploaded_at'
         ]
+        # Relations read through source=... and nested serializers, mapped to the fields
+        # that need them; license_prices reads the license multipliers from the context
+        select_related = {
+            'artist': ('artist_name', 'artist_full_name', 'artist_bio'),
+            'genre': ('genre',),
+            'mood': ('mood',),
+        }
+        context_loaders = {
+            'license_multipliers': (('license_prices',), active_license_multipliers),
+        }
     
     def get_license_prices(self, obj):
         """Get prices for all available license types"""
-        license_types = LicenseType.objects.filter(is_active=True)
+        # Views load the active multipliers once per request into the context
+        multipliers = self.context.get('license_multipliers')
+        if multipliers is None:
+            multipliers = active_license_multipliers()
         return {
-            license.name: float(obj.get_license_price(license.name))
-            for license in license_types
+            name: float(obj.base_price * multiplier)
+            for name, multiplier in multipliers.items()
         }
 
 
+AUDIO_EXTENSIONS = frozenset({'.mp3', '.wav', '.flac', '.m4a'})
+
+
 class TrackUploadSerializer(serializers.ModelSerializer):
     """Serializer for track upload (artists only)"""
     
@@ -94,7 +164,7 @@ class TrackUploadSerializer(serializers.ModelSerializer):
     
     def validate_audio_file(self, value):
         """Validate audio file format and size"""
-        if not value.name.lower().endswith(('.mp3', '.wav', '.flac', '.m4a')):
+        if os.path.splitext(value.name)[1].lower() not in AUDIO_EXTENSIONS:
             raise serializers.ValidationError(
                 "Only MP3, WAV, FLAC, and M4A files are allowed."
             )
@@ -114,11 +184,83 @@ class PurchaseSerializer(serializers.ModelSerializer):
     track_artist = serializers.CharField(source='track.artist.username', read_only=True)
     license_name = serializers.CharField(source='license_type.display_name', read_only=True)
     can_download = serializers.ReadOnlyField()
+    license_ready = serializers.SerializerMethodField()
     
     class Meta:
         model = Purchase
         fields = [
             'public_id', 'track_title', 'track_artist', 'license_name',
             'price_paid', 'currency', 'payment_status', 'can_download',
-            'download_count', 'max_downloads', 'purchased_at'
+            'download_count', 'max_downloads', 'purchased_at', 'license_ready'
         ]
+        # Relations read through source=..., mapped to the fields that need them and joined
+        # by the views
+        select_related = {
+            'track__artist': ('track_title', 'track_artist'),
+            'license_type': ('license_name',),
+        }
+
+    def get_license_ready(self, obj):
+        """False while the license certificate is still being generated"""
+        return bool(obj.license_file)
+
+
+# Plain-dict equivalents of the read-only list serializers above. The hot list
+# endpoints use these to skip DRF's per-field bind/to_representation work; the
+# serializer classes stay as the schema (OPTIONS, browsable API) and must be
+# kept in step with them.
+
+def _file_url(field_file, request):
+    """Render a file field like DRF's FileField: absolute URL or None"""
+    if not field_file:
+        return None
+    url = field_file.url
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def _datetime(value):
+    """Render a datetime like DRF's DateTimeField: ISO 8601 with UTC as Z"""
+    if value is None:
+        return None
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def serialize_track_list(track, request=None):
+    """Same output as TrackListSerializer"""
+    return {
+        'public_id': str(track.public_id),
+        'title': track.title,
+        'artist_name': track.artist_username,
+        'artist_full_name': track.artist_full_name,
+        'genre_name': track.genre.name if track.genre else None,
+        'mood_name': track.mood.name if track.mood else None,
+        'base_price': str(track.base_price),
+        'duration_formatted': track.duration_formatted,
+        'cover_image': _file_url(track.cover_image, request),
+        'preview_file': _file_url(track.preview_file, request),
+        'tag_list': track.tags_array,
+        'play_count': track.play_count,
+        'is_featured': track.is_featured,
+        'uploaded_at': _datetime(track.uploaded_at),
+    }
+
+
+def serialize_purchase(purchase, request=None):
+    """Same output as PurchaseSerializer"""
+    return {
+        'public_id': str(purchase.public_id),
+        'track_title': purchase.track.title,
+        'track_artist': purchase.track.artist.username,
+        'license_name': purchase.license_type.display_name,
+        'price_paid': str(purchase.price_paid),
+        'currency': purchase.currency,
+        'payment_status': purchase.payment_status,
+        'can_download': purchase.can_download,
+        'download_count': purchase.download_count,
+        'max_downloads': purchase.max_downloads,
+        'purchased_at': _datetime(purchase.purchased_at),
+        'license_ready': bool(purchase.license_file),
+    }
@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import (
+    Genre, Mood, LicenseType, Track,
+    ACTIVE_LICENSE_TYPES_CACHE_KEY, TRACK_SEARCH_FIELDS, TRACK_SEARCH_VECTOR
+)
+from .tasks import enqueue, process_track_audio
+from .utils.response_cache import invalidate_track_responses
+from .utils.metadata_cache import (
+    GENRES_CACHE_KEY, MOODS_CACHE_KEY, LICENSE_TYPES_CACHE_KEY
+)
+
+
+@receiver([post_save, post_delete], sender=Genre)
+def clear_genre_cache(sender, **kwargs):
+    """Drop the cached genre list whenever a genre changes"""
+    cache.delete(GENRES_CACHE_KEY)
+    invalidate_track_responses()
+
+
+@receiver([post_save, post_delete], sender=Mood)
+def clear_mood_cache(sender, **kwargs):
+    """Drop the cached mood list whenever a mood changes"""
+    cache.delete(MOODS_CACHE_KEY)
+    invalidate_track_responses()
+
+
+@receiver([post_save, post_delete], sender=LicenseType)
+def clear_license_type_cache(sender, **kwargs):
+    """Drop the cached license multipliers and list whenever a license type changes"""
+    cache.delete_many([LICENSE_TYPES_CACHE_KEY, ACTIVE_LICENSE_TYPES_CACHE_KEY])
+    invalidate_track_responses()
+
+
+@receiver(post_save, sender=get_user_model())
+def sync_track_artist_names(sender, instance, created, update_fields=None, **kwargs):
+    """Copy a changed username or name onto the artist's denormalized track rows, and drop cached
+    track responses when the artist's bio may have changed"""
+    if created:
+        return
+    if instance.is_artist and (update_fields is None or 'bio' in update_fields):
+        # Track detail responses embed artist_bio, which isn't denormalized; a save that may
+        # have changed it only needs the cached responses dropped
+        invalidate_track_responses()
+    if update_fields is not None and not {'username', 'first_name', 'last_name'} & set(update_fields):
+        return
+    updated = Track.objects.filter(artist=instance).exclude(
+        artist_username=instance.username,
+        artist_full_name=instance.full_name
+    ).update(
+        artist_username=instance.username,
+        artist_full_name=instance.full_name
+    )
+    if updated:
+        # The names are part of the search document; rebuild it from the new values
+        Track.objects.filter(artist=instance).update(search_vector=TRACK_SEARCH_VECTOR)
+        invalidate_track_responses()
+
+
+@receiver(post_save, sender=Track)
+def update_track_search_vector(sender, instance, created, update_fields=None, **kwargs):
+    """Rebuild the full-text document when a track's searchable text changes"""
+    if created or update_fields is None or set(TRACK_SEARCH_FIELDS) & set(update_fields):
+        Track.objects.filter(pk=instance.pk).update(search_vector=TRACK_SEARCH_VECTOR)
+
+
+@receiver([post_save, post_delete], sender=Track)
+def clear_track_response_cache(sender, **kwargs):
+    """Drop cached track list/detail responses whenever a track is written"""
+    invalidate_track_responses()
+
+
+@receiver(post_save, sender=Track)
+def queue_track_audio_processing(sender, instance, created, update_fields=None, **kwargs):
+    """Read metadata and build the preview in the background once the audio file is committed"""
+    if created or (update_fields and 'audio_file' in update_fields):
+        enqueue(process_track_audio, instance.pk)
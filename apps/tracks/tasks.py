@@ -0,0 +1,57 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+
+from .models import Track, Purchase
+from .utils.license_generator import generate_license_certificates
+
+logger = logging.getLogger(__name__)
+
+# Media lives on the web instance's disk, so background work runs in-process
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='tracks-tasks')
+
+
+def enqueue(func, *args):
+    """Run func(*args) on the background pool once the current transaction commits"""
+    transaction.on_commit(lambda: _executor.submit(_run, func, *args))
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Background task %s%r failed", func.__name__, args)
+    finally:
+        close_old_connections()
+
+
+def process_track_audio(track_id):
+    """Extract audio metadata and generate the 30-second preview, then store both with one UPDATE"""
+    track = Track.objects.filter(pk=track_id).first()
+    if track is None:
+        return
+
+    track._extract_audio_metadata()
+    track.audio_file.close()
+    track._generate_preview()
+    track.save(update_fields=['duration', 'file_size', 'bitrate', 'sample_rate', 'preview_file'])
+
+
+def record_play(track_id):
+    """Count one play with a single-column UPDATE, off the request path"""
+    Track.objects.filter(pk=track_id).update(play_count=F('play_count') + 1)
+
+
+def record_purchase(track_id):
+    """Count one purchase with a single-column UPDATE, after the purchase is committed"""
+    Track.objects.filter(pk=track_id).update(purchase_count=F('purchase_count') + 1)
+
+
+def build_license_pdfs(purchase_ids):
+    """Render and store license certificates for the given purchases that don't have one yet"""
+    purchases = Purchase.objects.select_related(
+        'track__artist', 'track__genre', 'license_type', 'buyer'
+    ).filter(pk__in=purchase_ids).filter(Q(license_file='') | Q(license_file__isnull=True))
+    generate_license_certificates(purchases)
@@ -1,3 +1,309 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import IntegrityError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from apps.users.models import User
+from .models import Genre, Mood, LicenseType, Track, Purchase, active_license_types
+from .views import _record_purchase, DuplicatePurchase
+
+
+def make_intent(intent_id, buyer, track, license_type, status='succeeded', amount=2999):
+    """A stand-in for the PaymentIntent create_payment_intent builds (metadata values are strings)"""
+    return SimpleNamespace(
+        id=intent_id,
+        status=status,
+        amount=amount,
+        metadata={
+            'track_id': str(track.public_id),
+            'license_type': license_type.name,
+            'buyer_id': str(buyer.public_id),
+            'buyer_pk': str(buyer.pk),
+            'track_pk': str(track.pk),
+            'license_type_pk': str(license_type.pk),
+        }
+    )
+
+
+class TrackTestCase(TestCase):
+    client_class = APIClient
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.artist = User.objects.create_user(
+            'artist', 'artist@example.com', 'testpass123',
+            first_name='Ada', last_name='Artist', role='artist'
+        )
+        cls.buyer = User.objects.create_user(
+            'buyer', 'buyer@example.com', 'testpass123',
+            first_name='Bo', last_name='Buyer'
+        )
+        cls.genre = Genre.objects.create(name='Hip Hop', slug='hip-hop')
+        cls.mood = Mood.objects.create(name='Chill', slug='chill')
+        cls.standard = LicenseType.objects.create(
+            name=LicenseType.STANDARD, display_name='Standard License',
+            description='Personal use', price_multiplier=1
+        )
+        cls.tracks = [
+            Track.objects.create(
+                title=f'Track {i}', artist=cls.artist, audio_file=f'tracks/artist/{i}.mp3',
+                genre=cls.genre, mood=cls.mood, tags='guitar, summer', duration=125,
+                base_price=10, status=Track.APPROVED
+            )
+            for i in range(3)
+        ]
+        cls.track = cls.tracks[0]
+
+    def setUp(self):
+        # Start every test from cold response caches; the shared license lookup is warmed
+        # so query counts only cover the view's own queries
+        cache.clear()
+        active_license_types()
+
+
+class TrackQueryCountTests(TrackTestCase):
+    def test_track_list_is_one_query(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('core-api:track-list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['artist_name'], 'artist')
+        self.assertEqual(response.data['results'][0]['tag_list'], ['guitar', 'summer'])
+
+    def test_track_list_is_served_from_cache(self):
+        self.client.get(reverse('core-api:track-list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('core-api:track-list'))
+        self.assertEqual(response.status_code, 200)
+
+    def test_unknown_query_params_share_the_cache_entry(self):
+        self.client.get(reverse('core-api:track-list'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('core-api:track-list'), {'x': 'junk'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_artist_bio_change_invalidates_track_detail(self):
+        url = reverse('core-api:track-detail', args=[self.track.public_id])
+        self.client.get(url)
+        self.artist.bio = 'New bio'
+        self.artist.save(update_fields=['bio'])
+        self.assertEqual(self.client.get(url).data['artist_bio'], 'New bio')
+
+    def test_track_detail_is_one_query(self):
+        url = reverse('core-api:track-detail', args=[self.track.public_id])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['artist_full_name'], 'Ada Artist')
+        self.assertEqual(response.data['license_prices'], {LicenseType.STANDARD: 10.0})
+        self.assertEqual(response.data['play_count'], 1)
+
+    def test_purchase_list_is_one_query(self):
+        for i, track in enumerate(self.tracks):
+            Purchase.objects.create(
+                buyer=self.buyer, track=track, license_type=self.standard,
+                stripe_payment_intent_id=f'pi_{i}', price_paid=10, payment_status='succeeded'
+            )
+        self.client.force_authenticate(self.buyer)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('core-api:user-purchases'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertFalse(response.data['results'][0]['license_ready'])
+
+
+class DownloadQueryCountTests(TrackTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media_override = self.settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        default_storage.save(self.track.audio_file.name, ContentFile(b'ID3'))
+        self.purchase = Purchase.objects.create(
+            buyer=self.buyer, track=self.track, license_type=self.standard,
+            stripe_payment_intent_id='pi_download', price_paid=10, payment_status='succeeded'
+        )
+        self.client.force_authenticate(self.buyer)
+
+    def test_track_download_is_one_query_plus_the_counter(self):
+        url = reverse('core-api:download-track', args=[self.purchase.public_id])
+        # The joined purchase lookup, then the conditional download_count UPDATE
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        response.close()
+        self.assertEqual(response.status_code, 200)
+        self.purchase.refresh_from_db()
+        self.assertEqual(self.purchase.download_count, 1)
+
+    def test_track_download_limit(self):
+        Purchase.objects.filter(pk=self.purchase.pk).update(download_count=3)
+        response = self.client.get(reverse('core-api:download-track', args=[self.purchase.public_id]))
+        self.assertEqual(response.status_code, 403)
+
+    def test_pending_license_certificate_is_one_query(self):
+        url = reverse('core-api:download-license', args=[self.purchase.public_id])
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            # Polling again while the render is pending does not queue another one
+            self.client.get(url)
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(len(callbacks), 1)
+
+    def test_license_certificate_download_is_one_query(self):
+        self.purchase.license_file = default_storage.save('licenses/license.pdf', ContentFile(b'%PDF-'))
+        self.purchase.save(update_fields=['license_file'])
+        url = reverse('core-api:download-license', args=[self.purchase.public_id])
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        response.close()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+
+class RecordPurchaseTests(TrackTestCase):
+    def test_records_once_and_queues_counters(self):
+        intent = make_intent('pi_new', self.buyer, self.track, self.standard)
+        with self.captureOnCommitCallbacks() as callbacks:
+            purchase = _record_purchase(intent, self.buyer.pk, self.track.pk, self.standard.pk)
+            again = _record_purchase(intent, self.buyer.pk, self.track.pk, self.standard.pk)
+        self.assertEqual(purchase.pk, again.pk)
+        self.assertEqual(str(purchase.price_paid), '29.99')
+        # record_purchase and build_license_pdfs, for the first call only
+        self.assertEqual(len(callbacks), 2)
+
+    def test_race_with_the_other_path_returns_its_purchase(self):
+        existing = Purchase.objects.create(
+            buyer=self.buyer, track=self.track, license_type=self.standard,
+            stripe_payment_intent_id='pi_race', price_paid=10, payment_status='succeeded'
+        )
+        intent = make_intent('pi_race', self.buyer, self.track, self.standard)
+        # The other path committed between our lookup and our INSERT
+        with mock.patch.object(Purchase.objects, 'get_or_create', side_effect=IntegrityError):
+            purchase = _record_purchase(intent, self.buyer.pk, self.track.pk, self.standard.pk)
+        self.assertEqual(purchase.pk, existing.pk)
+
+    @mock.patch('apps.tracks.views.stripe.Refund.create')
+    def test_already_owned_license_is_refunded(self, refund):
+        Purchase.objects.create(
+            buyer=self.buyer, track=self.track, license_type=self.standard,
+            stripe_payment_intent_id='pi_first', price_paid=10, payment_status='succeeded'
+        )
+        intent = make_intent('pi_second', self.buyer, self.track, self.standard)
+        with self.assertRaises(DuplicatePurchase):
+            _record_purchase(intent, self.buyer.pk, self.track.pk, self.standard.pk)
+        refund.assert_called_once_with(
+            payment_intent='pi_second',
+            reason='duplicate',
+            metadata={'refund_reason': 'duplicate_purchase'},
+            idempotency_key='duplicate-purchase-pi_second'
+        )
+        self.assertFalse(Purchase.objects.filter(stripe_payment_intent_id='pi_second').exists())
+
+
+class ConfirmPurchaseTests(TrackTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.buyer)
+
+    def confirm(self, intent_id):
+        return self.client.post(reverse('core-api:confirm-purchase'), {'payment_intent_id': intent_id})
+
+    @mock.patch('apps.tracks.views.stripe.PaymentIntent.retrieve')
+    def test_confirm_records_the_purchase(self, retrieve):
+        retrieve.return_value = make_intent('pi_confirm', self.buyer, self.track, self.standard)
+        response = self.confirm('pi_confirm')
+        self.assertEqual(response.status_code, 200)
+        purchase = Purchase.objects.get(stripe_payment_intent_id='pi_confirm')
+        self.assertEqual(response.data['purchase_id'], purchase.public_id)
+
+        # Confirming again (or after the webhook) reads the purchase without calling Stripe
+        retrieve.reset_mock()
+        response = self.confirm('pi_confirm')
+        self.assertEqual(response.status_code, 200)
+        retrieve.assert_not_called()
+        self.assertEqual(Purchase.objects.filter(stripe_payment_intent_id='pi_confirm').count(), 1)
+
+    @mock.patch('apps.tracks.views.stripe.PaymentIntent.retrieve')
+    def test_confirm_rejects_unsuccessful_payments(self, retrieve):
+        retrieve.return_value = make_intent(
+            'pi_pending', self.buyer, self.track, self.standard, status='requires_payment_method'
+        )
+        self.assertEqual(self.confirm('pi_pending').status_code, 400)
+        self.assertFalse(Purchase.objects.exists())
+
+    @mock.patch('apps.tracks.views.stripe.PaymentIntent.retrieve')
+    def test_confirm_rejects_another_buyers_payment(self, retrieve):
+        retrieve.return_value = make_intent('pi_other', self.artist, self.track, self.standard)
+        self.assertEqual(self.confirm('pi_other').status_code, 403)
+        self.assertFalse(Purchase.objects.exists())
+
+    @mock.patch('apps.tracks.views.stripe.Refund.create')
+    @mock.patch('apps.tracks.views.stripe.PaymentIntent.retrieve')
+    def test_confirm_duplicate_license_is_a_conflict(self, retrieve, refund):
+        Purchase.objects.create(
+            buyer=self.buyer, track=self.track, license_type=self.standard,
+            stripe_payment_intent_id='pi_first', price_paid=10, payment_status='succeeded'
+        )
+        retrieve.return_value = make_intent('pi_second', self.buyer, self.track, self.standard)
+        self.assertEqual(self.confirm('pi_second').status_code, 409)
+        refund.assert_called_once()
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET='whsec_test')
+class StripeWebhookTests(TrackTestCase):
+    def post_event(self, intent, event_type='payment_intent.succeeded'):
+        event = {'type': event_type, 'data': {'object': intent}}
+        with mock.patch('apps.tracks.views.stripe.Webhook.construct_event', return_value=event):
+            return self.client.post(
+                reverse('core-api:stripe-webhook'), b'{}',
+                content_type='application/json', HTTP_STRIPE_SIGNATURE='t=1,v1=test'
+            )
+
+    def test_webhook_records_the_purchase_once(self):
+        intent = make_intent('pi_hook', self.buyer, self.track, self.standard)
+        self.assertEqual(self.post_event(intent).status_code, 200)
+        # Stripe redelivers events; the second delivery is a no-op
+        self.assertEqual(self.post_event(intent).status_code, 200)
+        self.assertEqual(Purchase.objects.filter(stripe_payment_intent_id='pi_hook').count(), 1)
+
+    def test_webhook_ignores_payments_without_our_metadata(self):
+        intent = SimpleNamespace(id='pi_foreign', status='succeeded', amount=500, metadata={})
+        self.assertEqual(self.post_event(intent).status_code, 200)
+        self.assertFalse(Purchase.objects.exists())
+
+    @mock.patch('apps.tracks.views.stripe.Refund.create')
+    def test_webhook_acknowledges_duplicate_license(self, refund):
+        Purchase.objects.create(
+            buyer=self.buyer, track=self.track, license_type=self.standard,
+            stripe_payment_intent_id='pi_first', price_paid=10, payment_status='succeeded'
+        )
+        intent = make_intent('pi_second', self.buyer, self.track, self.standard)
+        self.assertEqual(self.post_event(intent).status_code, 200)
+        refund.assert_called_once()
+        self.assertEqual(Purchase.objects.count(), 1)
+
+    def test_webhook_rejects_bad_signatures(self):
+        response = self.client.post(
+            reverse('core-api:stripe-webhook'), b'{}',
+            content_type='application/json', HTTP_STRIPE_SIGNATURE='t=1,v1=forged'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    @override_settings(STRIPE_WEBHOOK_SECRET='')
+    def test_webhook_refuses_events_without_a_secret(self):
+        # A signature computed with an empty key must not be enough to record a purchase
+        intent = make_intent('pi_forged', self.buyer, self.track, self.standard)
+        self.assertEqual(self.post_event(intent).status_code, 503)
+        self.assertFalse(Purchase.objects.exists())
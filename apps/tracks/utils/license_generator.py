@@ -1,9 +1,10 @@
 # apps/tracks/utils/license_generator.py
 
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO
-from django.core.files.base import ContentFile
+from django.core.files import File
 from django.conf import settings
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
@@ -12,10 +13,67 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
-
-
-def generate_license_certificate(purchase):
-    """Generate a PDF license certificate for a purchase"""
+from apps.tracks.models import Purchase
+
+# Storage writes are I/O bound, so bulk issuing overlaps them
+LICENSE_UPLOAD_WORKERS = 4
+
+# Styles are immutable once built, so every certificate shares them
+_STYLES = getSampleStyleSheet()
+
+_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_STYLES['Heading1'],
+    fontSize=24,
+    spaceAfter=30,
+    textColor=colors.HexColor('#2c3e50'),
+    alignment=1  # Center alignment
+)
+
+_HEADER_STYLE = ParagraphStyle(
+    'CustomHeader',
+    parent=_STYLES['Heading2'],
+    fontSize=16,
+    spaceAfter=12,
+    textColor=colors.HexColor('#34495e'),
+    alignment=0  # Left alignment
+)
+
+_BODY_STYLE = ParagraphStyle(
+    'CustomBody',
+    parent=_STYLES['Normal'],
+    fontSize=11,
+    spaceAfter=12,
+    textColor=colors.HexColor('#2c3e50'),
+    alignment=0
+)
+
+_FOOTER_STYLE = ParagraphStyle(
+    'Footer',
+    parent=_STYLES['Normal'],
+    fontSize=9,
+    textColor=colors.HexColor('#7f8c8d'),
+    alignment=1  # Center alignment
+)
+
+# Shared by the track and license holder tables
+_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+])
+
+# Section headings in the canvas version
+_SIMPLE_HEADINGS = frozenset({"TRACK INFORMATION", "LICENSE HOLDER", "LICENSE PERMISSIONS"})
+
+
+def _render_license_certificate(purchase):
+    """Build the certificate PDF for a purchase into a rewound in-memory buffer"""
 
     buffer = BytesIO()
 
@@ -32,39 +90,8 @@ def generate_license_certificate(purchase):
     # Container for the 'Flowable' objects
     story = []
 
-    # Get styles
-    styles = getSampleStyleSheet()
-
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor=colors.HexColor('#2c3e50'),
-        alignment=1  # Center alignment
-    )
-
-    header_style = ParagraphStyle(
-        'CustomHeader',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        textColor=colors.HexColor('#34495e'),
-        alignment=0  # Left alignment
-    )
-
-    body_style = ParagraphStyle(
-        'CustomBody',
-        parent=styles['Normal'],
-        fontSize=11,
-        spaceAfter=12,
-        textColor=colors.HexColor('#2c3e50'),
-        alignment=0
-    )
-
     # Title
-    story.append(Paragraph("MUSIC LICENSE CERTIFICATE", title_style))
+    story.append(Paragraph("MUSIC LICENSE CERTIFICATE", _TITLE_STYLE))
     story.append(Spacer(1, 20))
 
     # Certificate info
@@ -73,11 +100,11 @@ def generate_license_certificate(purchase):
     <b>Issue Date:</b> {purchase.purchased_at.strftime('%B %d, %Y')}<br/>
     <b>License Type:</b> {purchase.license_type.display_name}
     """
-    story.append(Paragraph(cert_info, body_style))
+    story.append(Paragraph(cert_info, _BODY_STYLE))
     story.append(Spacer(1, 20))
 
     # Track Information
-    story.append(Paragraph("TRACK INFORMATION", header_style))
+    story.append(Paragraph("TRACK INFORMATION", _HEADER_STYLE))
 
     track_data = [
         ['Track Title:', purchase.track.title],
@@ -90,22 +117,13 @@ def generate_license_certificate(purchase):
     ]
 
     track_table = Table(track_data, colWidths=[2 * inch, 4 * inch])
-    track_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    track_table.setStyle(_TABLE_STYLE)
 
     story.append(track_table)
     story.append(Spacer(1, 20))
 
     # License Holder Information
-    story.append(Paragraph("LICENSE HOLDER", header_style))
+    story.append(Paragraph("LICENSE HOLDER", _HEADER_STYLE))
 
     buyer_data = [
         ['Name:', f"{purchase.buyer.first_name} {purchase.buyer.last_name}"],
@@ -116,22 +134,13 @@ def generate_license_certificate(purchase):
     ]
 
     buyer_table = Table(buyer_data, colWidths=[2 * inch, 4 * inch])
-    buyer_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ecf0f1')),
-        ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2c3e50')),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-        ('FONTNAME', (1, 0), (1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#bdc3c7')),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-    ]))
+    buyer_table.setStyle(_TABLE_STYLE)
 
     story.append(buyer_table)
     story.append(Spacer(1, 20))
 
     # License Terms
-    story.append(Paragraph("LICENSE TERMS & PERMISSIONS", header_style))
+    story.append(Paragraph("LICENSE TERMS & PERMISSIONS", _HEADER_STYLE))
 
     license_terms = f"""
     <b>License Description:</b><br/>
@@ -148,7 +157,7 @@ def generate_license_certificate(purchase):
     • Downloads Remaining: {purchase.max_downloads - purchase.download_count}
     """
 
-    story.append(Paragraph(license_terms, body_style))
+    story.append(Paragraph(license_terms, _BODY_STYLE))
     story.append(Spacer(1, 30))
 
     # Footer
@@ -162,34 +171,61 @@ def generate_license_certificate(purchase):
     Certificate issued on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}
     """
 
-    footer_style = ParagraphStyle(
-        'Footer',
-        parent=styles['Normal'],
-        fontSize=9,
-        textColor=colors.HexColor('#7f8c8d'),
-        alignment=1  # Center alignment
-    )
-
-    story.append(Paragraph(footer_text, footer_style))
+    story.append(Paragraph(footer_text, _FOOTER_STYLE))
 
     # Build PDF
     doc.build(story)
+    buffer.seek(0)
+    return buffer
 
-    # Get PDF content
-    pdf_content = buffer.getvalue()
-    buffer.close()
 
-    # Save to purchase model
+def _store_license_certificate(purchase, buffer, save):
+    """Write a rendered certificate to storage, streaming the buffer instead of copying it out"""
     filename = f"license_{purchase.track.title}_{purchase.license_type.name}_{purchase.public_id}.pdf"
-    purchase.license_file.save(
-        filename,
-        ContentFile(pdf_content),
-        save=True
-    )
+    try:
+        purchase.license_file.save(filename, File(buffer), save=save)
+    finally:
+        buffer.close()
 
+
+def generate_license_certificate(purchase):
+    """Generate a PDF license certificate for a purchase"""
+    _store_license_certificate(purchase, _render_license_certificate(purchase), save=True)
     return purchase.license_file.url
 
 
+def generate_license_certificates(purchases):
+    """Generate certificates for many purchases (e.g. a bundle) with parallel uploads and one UPDATE"""
+    purchases = list(purchases)
+    if not purchases:
+        return
+
+    # Rendering is CPU bound and stays on this thread; each upload starts as soon as its PDF is built.
+    # A failure for one purchase, rendering or uploading, must not orphan the uploads already done.
+    failures = []
+    uploads = []
+    with ThreadPoolExecutor(max_workers=min(len(purchases), LICENSE_UPLOAD_WORKERS)) as executor:
+        for purchase in purchases:
+            try:
+                buffer = _render_license_certificate(purchase)
+            except Exception as exc:  # Re-raised below, after the stored certificates are recorded
+                failures.append(exc)
+                continue
+            uploads.append((purchase, executor.submit(_store_license_certificate, purchase, buffer, False)))
+
+    stored = []
+    for purchase, future in uploads:
+        if future.exception() is None:
+            stored.append(purchase)
+        else:
+            failures.append(future.exception())
+    Purchase.objects.bulk_update(stored, ['license_file'])
+
+    # Surface the first failure once the successful ones are recorded
+    if failures:
+        raise failures[0]
+
+
 # Alternative simpler version using canvas directly
 def generate_simple_license_certificate(purchase):
     """Generate a simpler PDF license certificate using canvas"""
@@ -201,7 +237,7 @@ def generate_simple_license_certificate(purchase):
     # Title
     p.setFont("Helvetica-Bold", 24)
     p.setFillColor(colors.HexColor('#2c3e50'))
-    p.drawCentredText(width / 2, height - 100, "MUSIC LICENSE CERTIFICATE")
+    p.drawCentredString(width / 2, height - 100, "MUSIC LICENSE CERTIFICATE")
 
     # Certificate details
     y_position = height - 150
@@ -230,7 +266,7 @@ def generate_simple_license_certificate(purchase):
     ]
 
     for detail in details:
-        if detail == "TRACK INFORMATION" or detail == "LICENSE HOLDER" or detail == "LICENSE PERMISSIONS":
+        if detail in _SIMPLE_HEADINGS:
             p.setFont("Helvetica-Bold", 14)
         else:
             p.setFont("Helvetica", 11)
@@ -241,14 +277,13 @@ def generate_simple_license_certificate(purchase):
     p.save()
 
     # Save to purchase model
-    pdf_content = buffer.getvalue()
-    buffer.close()
-
+    buffer.seek(0)
     filename = f"license_{purchase.public_id}.pdf"
     purchase.license_file.save(
         filename,
-        ContentFile(pdf_content),
+        File(buffer),
         save=True
     )
+    buffer.close()
 
     return purchase.license_file.url
\ No newline at end of file
@@ -0,0 +1,31 @@
+# apps/tracks/utils/metadata_cache.py
+
+import orjson
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from apps.tracks.models import active_license_types
+
+METADATA_CACHE_TIMEOUT = 60 * 60  # These lists change rarely; signals invalidate on writes
+
+# Decimals (price_multiplier) are rendered as strings, as DjangoJSONEncoder always has
+_django_default = DjangoJSONEncoder().default
+
+GENRES_CACHE_KEY = 'metadata:genres'
+MOODS_CACHE_KEY = 'metadata:moods'
+LICENSE_TYPES_CACHE_KEY = 'metadata:license_types'
+
+
+def cached_json_list(cache_key, queryset, fields):
+    """Return the queryset's values() as JSON bytes, building them once per cache timeout"""
+    content = cache.get(cache_key)
+    if content is None:
+        # Stored as bytes so responses write them out without re-encoding
+        content = orjson.dumps(list(queryset.values(*fields)), default=_django_default)
+        cache.set(cache_key, content, METADATA_CACHE_TIMEOUT)
+    return content
+
+
+def active_license_multipliers():
+    """Return {name: price_multiplier} for the active license types, from the same cache entry
+    get_license_price() charges from"""
+    return {name: multiplier for name, (multiplier, _) in active_license_types().items()}
@@ -0,0 +1,36 @@
+# apps/tracks/utils/response_cache.py
+
+import time
+from urllib.parse import urlencode
+from django.core.cache import cache
+
+TRACK_RESPONSE_CACHE_TIMEOUT = 60 * 15
+
+# Every cached track response key embeds this version; bumping it drops them all at once
+TRACKS_VERSION_CACHE_KEY = 'tracks:version'
+
+
+# Query params the track list/detail views read (filters, search, ordering, pagination and
+# sparse fields). Anything else is left out of the key, so junk params can't mint new entries.
+TRACK_RESPONSE_QUERY_PARAMS = ('cursor', 'fields', 'genre', 'is_featured', 'mood', 'ordering', 'page_size', 'search')
+
+
+def track_response_cache_key(kind, request):
+    """Cache key for a track list/detail response, varying on host, path and the params the views read"""
+    version = cache.get_or_set(TRACKS_VERSION_CACHE_KEY, lambda: int(time.time()), None)
+    params = urlencode([
+        (name, value)
+        for name in TRACK_RESPONSE_QUERY_PARAMS
+        for value in request.query_params.getlist(name)
+    ])
+    # The host stays in the key because responses embed absolute file URLs
+    return f'tracks:{kind}:{version}:{request.build_absolute_uri(request.path)}?{params}'
+
+
+def invalidate_track_responses():
+    """Bump the version so every cached track response is ignored"""
+    try:
+        cache.incr(TRACKS_VERSION_CACHE_KEY)
+    except ValueError:
+        # Key missing or evicted: start from a fresh timestamp so old keys cannot match
+        cache.set(TRACKS_VERSION_CACHE_KEY, int(time.time()), None)
@@ -1,52 +1,138 @@
-import os
+import logging
+import uuid
 from rest_framework import generics, permissions, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django_filters.rest_framework import DjangoFilterBackend
-from django.shortcuts import get_object_or_404
-from django.http import Http404
 import stripe
+from django.db import IntegrityError, transaction
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
 
-from .models import Track, Genre, Mood, LicenseType, Purchase
+from .models import Track, Genre, Mood, LicenseType, Purchase, active_license_type_id
 from .serializers import (
-    TrackListSerializer, TrackDetailSerializer, TrackUploadSerializer,
-    GenreSerializer, MoodSerializer, LicenseTypeSerializer, PurchaseSerializer
+    TrackListSerializer, TrackDetailSerializer, TrackUploadSerializer, PurchaseSerializer,
+    serialize_track_list, serialize_purchase
 )
 from .permissions import IsArtistOrReadOnly
-from django.http import FileResponse, Http404, HttpResponse
+from .pagination import TrackCursorPagination, PurchaseCursorPagination
+from .filters import TrackSearchFilter
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
-from .utils.license_generator import generate_license_certificate
-import mimetypes
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_safe
+from .tasks import enqueue, build_license_pdfs, record_play, record_purchase
+from .utils.response_cache import track_response_cache_key, TRACK_RESPONSE_CACHE_TIMEOUT
+from .utils.metadata_cache import (
+    cached_json_list,
+    GENRES_CACHE_KEY, MOODS_CACHE_KEY, LICENSE_TYPES_CACHE_KEY
+)
+
 
 
+User = get_user_model()
+
+logger = logging.getLogger(__name__)
 
 stripe.api_key = settings.STRIPE_SECRET_KEY
+# Fail payment calls after 30s instead of the library's 80s default
+stripe.default_http_client = stripe.RequestsClient(timeout=30)
+
+
+class SerializerHintsMixin:
+    """Preload the context a SparseFieldsMixin serializer declares, once per request"""
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context.update(self.get_serializer_class().preload_context(self.request))
+        return context
+
+
+class PlainListMixin:
+    """List objects through a plain dict function instead of instantiating serializer_class.
+
+    Views set item_renderer to a function taking (obj, request), e.g. serialize_track_list.
+    """
+    item_renderer = None
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        data = [self.item_renderer(obj, request) for obj in (queryset if page is None else page)]
+        if page is None:
+            return Response(data)
+        return self.get_paginated_response(data)
 
-class TrackListView(generics.ListAPIView):
+
+class TrackListView(PlainListMixin, generics.ListAPIView):
     """List all approved tracks with filtering and search"""
-    queryset = Track.objects.filter(status=Track.APPROVED)
     serializer_class = TrackListSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = TrackCursorPagination
+    item_renderer = staticmethod(serialize_track_list)
+    filter_backends = [DjangoFilterBackend, TrackSearchFilter, filters.OrderingFilter]
     filterset_fields = ['genre', 'mood', 'is_featured']
-    search_fields = ['title', 'artist__username', 'tags', 'description']
-    ordering_fields = ['uploaded_at', 'play_count', 'purchase_count', 'base_price']
+    # Documentation only: TrackSearchFilter matches Track.search_vector, built from these fields
+    search_fields = ['title', 'artist_username', 'tags', 'description']
+    # Cursor pagination needs a stable, near-unique key: counters change between page fetches
+    # and share values like 0, so they would skip or repeat rows
+    ordering_fields = ['uploaded_at']
     ordering = ['-uploaded_at']
 
+    def get_queryset(self):
+        # Only load the columns TrackListSerializer renders, plus the ordering_fields
+        # the cursor reads from the page edges
+        return Track.objects.filter(status=Track.APPROVED).select_related(
+            *TrackListSerializer.Meta.select_related.keys()
+        ).only(
+            'public_id', 'title', 'base_price', 'duration_formatted', 'cover_image',
+            'preview_file', 'tags_array', 'play_count', 'is_featured', 'uploaded_at',
+            'artist_username', 'artist_full_name', 'genre__name', 'mood__name'
+        )
+
+    def list(self, request, *args, **kwargs):
+        cache_key = track_response_cache_key('list', request)
+        data = cache.get(cache_key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        cache.set(cache_key, response.data, TRACK_RESPONSE_CACHE_TIMEOUT)
+        return response
+
 
-class TrackDetailView(generics.RetrieveAPIView):
+class TrackDetailView(SerializerHintsMixin, generics.RetrieveAPIView):
     """Get detailed track information"""
-    queryset = Track.objects.filter(status=Track.APPROVED)
     serializer_class = TrackDetailSerializer
     lookup_field = 'public_id'
-    
-    def get(self, request, *args, **kwargs):
+
+    def get_queryset(self):
+        return TrackDetailSerializer.optimize_queryset(
+            Track.objects.filter(status=Track.APPROVED), self.request
+        ).defer('search_vector')
+
+    def retrieve(self, request, *args, **kwargs):
         track = self.get_object()
-        # Increment play count when track details are viewed
-        track.increment_play_count()
-        return super().get(request, *args, **kwargs)
+        # Increment play count when track details are viewed; the UPDATE runs in the
+        # background and the response already shows the new total
+        enqueue(record_play, track.pk)
+        track.play_count += 1
+
+        cache_key = track_response_cache_key('detail', request)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self.get_serializer(track).data
+            cache.set(cache_key, data, TRACK_RESPONSE_CACHE_TIMEOUT)
+
+        # Counters change through F() updates that do not invalidate the cache
+        data = dict(data)
+        for counter in ('play_count', 'purchase_count'):
+            if counter in data:
+                data[counter] = getattr(track, counter)
+        return Response(data)
 
 
 class TrackUploadView(generics.CreateAPIView):
@@ -62,304 +148,467 @@ class TrackUploadView(generics.CreateAPIView):
         )
 
 
-class ArtistTracksView(generics.ListAPIView):
+class ArtistTracksView(SerializerHintsMixin, generics.ListAPIView):
     """List tracks for the authenticated artist"""
     serializer_class = TrackDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Track.objects.filter(artist=self.request.user)
+        return TrackDetailSerializer.optimize_queryset(
+            Track.objects.filter(artist=self.request.user), self.request
+        ).defer('rejection_reason', 'search_vector')
+
 
+# Metadata lists are small, public and rarely change, so they skip DRF serializers.
+# Browsers and CDNs may reuse them for a few minutes; the server copy is invalidated on writes
+METADATA_MAX_AGE = 60 * 5
 
-class GenreListView(generics.ListAPIView):
+
+@require_safe
+@cache_control(public=True, max_age=METADATA_MAX_AGE)
+def genre_list(request):
     """List all genres"""
-    queryset = Genre.objects.all()
-    serializer_class = GenreSerializer
+    content = cached_json_list(
+        GENRES_CACHE_KEY, Genre.objects.all(),
+        ['id', 'name', 'slug', 'description']
+    )
+    return HttpResponse(content, content_type='application/json')
 
 
-class MoodListView(generics.ListAPIView):
+@require_safe
+@cache_control(public=True, max_age=METADATA_MAX_AGE)
+def mood_list(request):
     """List all moods"""
-    queryset = Mood.objects.all()
-    serializer_class = MoodSerializer
+    content = cached_json_list(
+        MOODS_CACHE_KEY, Mood.objects.all(),
+        ['id', 'name', 'slug', 'description']
+    )
+    return HttpResponse(content, content_type='application/json')
 
 
-class LicenseTypeListView(generics.ListAPIView):
+@require_safe
+@cache_control(public=True, max_age=METADATA_MAX_AGE)
+def license_type_list(request):
     """List all active license types"""
-    queryset = LicenseType.objects.filter(is_active=True)
-    serializer_class = LicenseTypeSerializer
+    content = cached_json_list(
+        LICENSE_TYPES_CACHE_KEY, LicenseType.objects.filter(is_active=True),
+        [
+            'id', 'name', 'display_name', 'description',
+            'price_multiplier', 'allows_commercial_use',
+            'allows_modification', 'requires_attribution', 'max_copies'
+        ]
+    )
+    return HttpResponse(content, content_type='application/json')
 
 
 
-# Add this debugging version to your views.py
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_payment_intent(request):
+    """Create a Stripe PaymentIntent for a track and license type"""
+    # Check if data exists
+    if not request.data:
+        return Response(
+            {'error': 'No data provided'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    track_id = request.data.get('track_id')
+    license_type = request.data.get('license_type', 'standard')
+
+    if not track_id:
+        return Response(
+            {'error': 'track_id is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
+    # Parse once so the lookup binds a native uuid instead of a string to cast
     try:
-        # Check if data exists
-        if not request.data:
-            return Response(
-                {'error': 'No data provided'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+        track_id = uuid.UUID(str(track_id))
+    except ValueError:
+        return Response(
+            {'error': f'Invalid track_id: {track_id}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # One round-trip for the track and the ownership check; license prices come
+    # from the per-process license type cache
+    track = Track.objects.filter(
+        public_id=track_id, status=Track.APPROVED
+    ).annotate(
+        already_owned=Exists(Purchase.objects.filter(
+            buyer=request.user,
+            track=OuterRef('pk'),
+            license_type__name=license_type,
+            payment_status='succeeded'
+        ))
+    ).only('pk', 'public_id', 'title', 'base_price').first()
 
-        track_id = request.data.get('track_id')
-        license_type = request.data.get('license_type', 'standard')
+    if track is None:
+        return Response(
+            {'error': f'Track not found: {track_id}'},
+            status=status.HTTP_404_NOT_FOUND
+        )
 
+    if track.already_owned:
+        return Response(
+            {'error': 'You already own this track with this license type'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
 
-        if not track_id:
-            return Response(
-                {'error': 'track_id is required'},
-                status=status.HTTP_400_BAD_REQUEST
+    # Unknown or retired license types can't be confirmed later, so refuse them before charging
+    license_type_pk = active_license_type_id(license_type)
+    if license_type_pk is None:
+        return Response(
+            {'error': f'Unknown license type: {license_type}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # Calculate price
+    price = track.get_license_price(license_type)
+    amount = int(price * 100)  # Stripe uses cents
+
+    # Check Stripe configuration
+    if not stripe.api_key:
+        return Response(
+            {'error': 'Payment system not configured'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    try:
+        intent = stripe.PaymentIntent.create(
+            amount=amount,
+            currency='usd',
+            metadata={
+                'track_id': str(track.public_id),
+                'license_type': license_type,
+                'buyer_id': str(request.user.public_id),
+                'buyer_pk': str(request.user.pk),
+                # Primary keys let the purchase be inserted without looking anything up
+                'track_pk': str(track.pk),
+                'license_type_pk': str(license_type_pk),
+            }
+        )
+    except stripe.StripeError as e:
+        logger.warning("Stripe rejected a payment intent for track %s: %s", track.pk, e)
+        return Response(
+            {'error': f'Payment system error: {e.user_message or str(e)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    response_data = {
+        'client_secret': intent.client_secret,
+        'amount': price,
+        'track_title': track.title,
+        'license_type': license_type
+    }
+    return Response(response_data)
+
+
+class DuplicatePurchase(Exception):
+    """The buyer already owns this track and license through a different payment"""
+
+
+def _intent_purchase_keys(intent):
+    """(buyer pk, track pk, license type pk) for an intent made by create_payment_intent, else None"""
+    metadata = intent.metadata or {}
+    if {'buyer_pk', 'track_pk', 'license_type_pk'} <= metadata.keys():
+        return int(metadata['buyer_pk']), int(metadata['track_pk']), int(metadata['license_type_pk'])
+
+    # Intents created before the primary keys were added to their metadata
+    if not {'buyer_id', 'track_id', 'license_type'} <= metadata.keys():
+        return None
+    try:
+        buyer_pk = User.objects.filter(public_id=metadata['buyer_id']).values_list('pk', flat=True).first()
+        track_pk = Track.objects.filter(public_id=metadata['track_id']).values_list('pk', flat=True).first()
+    except ValidationError:
+        return None
+    license_type_pk = LicenseType.objects.filter(
+        name=metadata['license_type']
+    ).values_list('pk', flat=True).first()
+    if None in (buyer_pk, track_pk, license_type_pk):
+        return None
+    return buyer_pk, track_pk, license_type_pk
+
+
+def _refund_duplicate_payment(intent):
+    """Refund a payment for a license the buyer already owns"""
+    logger.warning("Payment intent %s duplicates an existing purchase; refunding it", intent.id)
+    try:
+        # Keyed on the intent so the webhook and the confirm call refund it only once
+        stripe.Refund.create(
+            payment_intent=intent.id,
+            reason='duplicate',
+            metadata={'refund_reason': 'duplicate_purchase'},
+            idempotency_key=f'duplicate-purchase-{intent.id}'
+        )
+    except stripe.StripeError:
+        logger.exception("Could not refund duplicate payment intent %s; refund it manually", intent.id)
+
+
+def _record_purchase(intent, buyer_pk, track_pk, license_type_pk):
+    """Create the Purchase for a succeeded PaymentIntent exactly once and return it.
+
+    Raises DuplicatePurchase when the buyer already owns the track with this license
+    through another payment; that payment is refunded.
+    """
+    try:
+        with transaction.atomic():
+            # Create purchase record; the webhook and the client confirmation may both arrive
+            purchase, created = Purchase.objects.get_or_create(
+                stripe_payment_intent_id=intent.id,
+                defaults={
+                    'buyer_id': buyer_pk,
+                    'track_id': track_pk,
+                    'license_type_id': license_type_pk,
+                    'price_paid': intent.amount / 100,  # Convert from cents
+                    'payment_status': 'succeeded',
+                }
             )
+            if created:
+                # Update track purchase count and render the certificate once the purchase
+                # is committed; purchases report license_ready until the PDF exists
+                enqueue(record_purchase, track_pk)
+                enqueue(build_license_pdfs, [purchase.pk])
+    except IntegrityError:
+        # Either the other path recorded this intent first, or the buyer/track/license
+        # is already owned through a different intent
+        purchase = Purchase.objects.filter(stripe_payment_intent_id=intent.id).first()
+        if purchase is None:
+            _refund_duplicate_payment(intent)
+            raise DuplicatePurchase(intent.id)
+    return purchase
+
 
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def confirm_purchase(request):
+    """Confirm purchase after successful Stripe payment"""
+    payment_intent_id = request.data.get('payment_intent_id')
+    if not payment_intent_id:
+        return Response(
+            {'error': 'payment_intent_id is required'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # The Stripe webhook has usually recorded the purchase already
+    purchase = Purchase.objects.filter(
+        stripe_payment_intent_id=payment_intent_id,
+        buyer=request.user
+    ).only('public_id').first()
+
+    if purchase is None:
+        # Webhook not delivered yet: retrieve payment intent from Stripe
         try:
-            track = Track.objects.get(public_id=track_id, status=Track.APPROVED)
-        except Track.DoesNotExist:
+            intent = stripe.PaymentIntent.retrieve(payment_intent_id)
+        except stripe.StripeError as e:
+            logger.warning("Could not retrieve payment intent %s: %s", payment_intent_id, e)
             return Response(
-                {'error': f'Track not found: {track_id}'},
-                status=status.HTTP_404_NOT_FOUND
+                {'error': e.user_message or str(e)},
+                status=status.HTTP_400_BAD_REQUEST
             )
 
-        existing_purchase = Purchase.objects.filter(
-            buyer=request.user,
-            track=track,
-            license_type__name=license_type,
-            payment_status='succeeded'
-        ).exists()
-
-        if existing_purchase:
+        if intent.status != 'succeeded':
             return Response(
-                {'error': 'You already own this track with this license type'},
+                {'error': 'Payment was not successful'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        # Calculate price
-        try:
-            price = track.get_license_price(license_type)
-        except Exception as e:
+        keys = _intent_purchase_keys(intent)
+        if keys is None:
             return Response(
-                {'error': f'Error calculating price: {str(e)}'},
+                {'error': 'This payment is not a track purchase'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-
-        amount = int(price * 100)  # Stripe uses cents
-
-        # Check Stripe configuration
-        if not stripe.api_key:
+        if keys[0] != request.user.pk:
             return Response(
-                {'error': 'Payment system not configured'},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {'error': 'This payment belongs to another account'},
+                status=status.HTTP_403_FORBIDDEN
             )
 
         try:
-            intent = stripe.PaymentIntent.create(
-                amount=amount,
-                currency='usd',
-                metadata={
-                    'track_id': str(track.public_id),
-                    'license_type': license_type,
-                    'buyer_id': str(request.user.public_id),
-                }
-            )
-        except Exception as e:
+            purchase = _record_purchase(intent, *keys)
+        except DuplicatePurchase:
             return Response(
-                {'error': f'Payment system error: {str(e)}'},
-                status=status.HTTP_400_BAD_REQUEST
+                {'error': 'You already own this track with this license type; this payment will be refunded'},
+                status=status.HTTP_409_CONFLICT
             )
 
-        response_data = {
-            'client_secret': intent.client_secret,
-            'amount': price,
-            'track_title': track.title,
-            'license_type': license_type
-        }
-        return Response(response_data)
-
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return Response(
-            {'error': f'Unexpected error: {str(e)}'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    return Response({
+        'success': True,
+        'purchase_id': purchase.public_id,
+        'message': 'Purchase confirmed successfully'
+    })
 
 
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    """Record purchases from Stripe's payment_intent.succeeded events"""
+    # HMAC accepts an empty key, so without a secret anyone could sign an event
+    if not settings.STRIPE_WEBHOOK_SECRET:
+        logger.error("STRIPE_WEBHOOK_SECRET is not set; refusing Stripe webhook events")
+        return HttpResponse(status=503)
 
-@api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
-def confirm_purchase(request):
-    """Confirm purchase after successful Stripe payment"""
     try:
-        payment_intent_id = request.data.get('payment_intent_id')
-        
-        # Retrieve payment intent from Stripe
-        intent = stripe.PaymentIntent.retrieve(payment_intent_id)
-        
-        if intent.status == 'succeeded':
-            # Create purchase record
-            track = get_object_or_404(Track, public_id=intent.metadata['track_id'])
-            license_type = get_object_or_404(LicenseType, name=intent.metadata['license_type'])
-            
-            purchase = Purchase.objects.create(
-                buyer=request.user,
-                track=track,
-                license_type=license_type,
-                stripe_payment_intent_id=payment_intent_id,
-                price_paid=intent.amount / 100,  # Convert from cents
-                payment_status='succeeded'
-            )
-            
-            # Update track purchase count
-            track.increment_purchase_count()
-            
-            return Response({
-                'success': True,
-                'purchase_id': purchase.public_id,
-                'message': 'Purchase confirmed successfully'
-            })
-        else:
-            return Response(
-                {'error': 'Payment was not successful'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-            
-    except Exception as e:
-        return Response(
-            {'error': str(e)}, 
-            status=status.HTTP_400_BAD_REQUEST
+        event = stripe.Webhook.construct_event(
+            request.body,
+            request.headers.get('Stripe-Signature', ''),
+            settings.STRIPE_WEBHOOK_SECRET
         )
+    except (ValueError, stripe.SignatureVerificationError):
+        return HttpResponse(status=400)
+
+    if event['type'] == 'payment_intent.succeeded':
+        intent = event['data']['object']
+        # Payments that didn't come from create_payment_intent are not ours to record
+        keys = _intent_purchase_keys(intent)
+        if keys is not None:
+            try:
+                _record_purchase(intent, *keys)
+            except DuplicatePurchase:
+                # Refunded; retrying the event would not change the outcome
+                pass
+
+    # Acknowledge everything that verified, so Stripe doesn't retry
+    return HttpResponse(status=200)
+
+
+def _purchase_qs(user):
+    """Succeeded purchases owned by user, joined with what the download views read"""
+    return Purchase.objects.select_related(*PurchaseSerializer.Meta.select_related.keys()).filter(
+        buyer=user,
+        payment_status='succeeded'
+    )
+
+
+def _serve_file(field_file, allow_redirect=False, **kwargs):
+    """Stream a stored file through the app; with allow_redirect, remote storages (Cloudinary, S3)
+    get a redirect to its URL instead.
+
+    Only public files (previews) may redirect: the storage URL is permanent and unsigned, so handing
+    it out for a paid download would bypass max_downloads. Raises FileNotFoundError for a missing
+    local file instead of stat()ing it first.
+    """
+    try:
+        path = field_file.path
+    except NotImplementedError:
+        if allow_redirect:
+            # Storages without a filesystem path serve the bytes from their own CDN
+            return HttpResponseRedirect(field_file.url)
+        return FileResponse(field_file.open('rb'), **kwargs)
+    return FileResponse(open(path, 'rb'), **kwargs)
 
 
-class UserPurchasesView(generics.ListAPIView):
+class UserPurchasesView(PlainListMixin, generics.ListAPIView):
     """List user's purchases"""
     serializer_class = PurchaseSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = PurchaseCursorPagination
+    item_renderer = staticmethod(serialize_purchase)
     
     def get_queryset(self):
-        return Purchase.objects.filter(buyer=self.request.user, payment_status='succeeded')
+        # Only load the columns PurchaseSerializer renders
+        return _purchase_qs(self.request.user).only(
+            'public_id', 'price_paid', 'currency', 'payment_status',
+            'download_count', 'max_downloads', 'purchased_at', 'license_file',
+            'track__title', 'track__artist__username', 'license_type__display_name'
+        )
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def download_purchased_track(request, purchase_id):
     """Download full quality track after purchase"""
-    try:
-        # Get the purchase and verify ownership
-        purchase = get_object_or_404(
-            Purchase,
-            public_id=purchase_id,
-            buyer=request.user,
-            payment_status='succeeded'
-        )
+    # Get the purchase and verify ownership
+    purchase = get_object_or_404(_purchase_qs(request.user), public_id=purchase_id)
 
-        # Check download limits
-        if not purchase.can_download:
-            return Response(
-                {
-                    'error': f'Download limit exceeded. You have used {purchase.download_count}/{purchase.max_downloads} downloads.'},
-                status=status.HTTP_403_FORBIDDEN
-            )
-
-        track = purchase.track
-
-        # Make sure file exists
-        if not track.audio_file or not os.path.exists(track.audio_file.path):
-            return Response(
-                {'error': 'Audio file not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+    track = purchase.track
 
-        # Increment download count
-        purchase.increment_download_count()
-
-        # Serve the file
-        response = FileResponse(
-            open(track.audio_file.path, 'rb'),
+    # Open the file before counting the download, so a missing file costs nothing.
+    # FileResponse sets Content-Length and an RFC 6266 filename, and gunicorn hands
+    # the real file to sendfile(2) through wsgi.file_wrapper
+    try:
+        if not track.audio_file:
+            raise FileNotFoundError
+        response = _serve_file(
+            track.audio_file,
+            as_attachment=True,
+            filename=f"{track.artist.username} - {track.title}.mp3",
             content_type='audio/mpeg'
         )
+    except FileNotFoundError:
+        return Response(
+            {'error': 'Audio file not found'},
+            status=status.HTTP_404_NOT_FOUND
+        )
 
-        # Set download filename
-        filename = f"{track.artist.username} - {track.title}.mp3"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        return response
-
-    except Exception as e:
+    # Increment download count, checking the limit in the same UPDATE
+    if not purchase.increment_download_count():
+        response.close()
         return Response(
-            {'error': str(e)},
-            status=status.HTTP_400_BAD_REQUEST
+            {
+                'error': f'Download limit exceeded. You have used {purchase.download_count}/{purchase.max_downloads} downloads.'},
+            status=status.HTTP_403_FORBIDDEN
         )
 
+    return response
+
 
 @api_view(['GET'])
 def stream_preview(request, track_id):
     """Stream preview file (no authentication required)"""
-    try:
-        track = get_object_or_404(Track, public_id=track_id, status=Track.APPROVED)
-
-        # Use preview file if available, otherwise serve a snippet of main file
-        if track.preview_file and os.path.exists(track.preview_file.path):
-            file_path = track.preview_file.path
-        elif track.audio_file and os.path.exists(track.audio_file.path):
-            # Fallback to main file (you might want to generate preview on-the-fly)
-            file_path = track.audio_file.path
-        else:
-            raise Http404("Preview not available")
-
-        # Increment play count
-        track.increment_play_count()
+    track = get_object_or_404(Track, public_id=track_id, status=Track.APPROVED)
 
+    # Never fall back to the full audio file: that is the paid product. A track whose preview is
+    # still being generated (or failed) has none until generate_missing_previews rebuilds it.
+    if not track.preview_file:
+        raise Http404("Preview not available")
+    try:
         # Stream the file (not download)
-        response = FileResponse(
-            open(file_path, 'rb'),
-            content_type='audio/mpeg'
-        )
+        response = _serve_file(track.preview_file, allow_redirect=True, content_type='audio/mpeg')
+    except FileNotFoundError:
+        raise Http404("Preview not available")
 
-        # Set headers for streaming (not download)
+    # Increment play count in the background
+    enqueue(record_play, track.pk)
+
+    # Set headers for streaming (not download)
+    if isinstance(response, FileResponse):
         response['Content-Disposition'] = 'inline'
         response['Accept-Ranges'] = 'bytes'
 
-        return response
+    return response
+
 
-    except Exception as e:
-        raise Http404("Preview not found")
+LICENSE_PDF_PENDING_TIMEOUT = 60 * 2
 
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def download_license_certificate(request, purchase_id):
     """Download license certificate PDF"""
-    try:
-        purchase = get_object_or_404(
-            Purchase,
-            public_id=purchase_id,
-            buyer=request.user,
-            payment_status='succeeded'
-        )
-
-        # Generate license certificate if not exists
-        if not purchase.license_file:
-            generate_license_certificate(purchase)
+    purchase = get_object_or_404(_purchase_qs(request.user), public_id=purchase_id)
 
-        if not purchase.license_file or not os.path.exists(purchase.license_file.path):
-            return Response(
-                {'error': 'License certificate not found'},
-                status=status.HTTP_404_NOT_FOUND
-            )
+    # Certificates are rendered in the background; queue one and let the client poll. The cache.add()
+    # guard keeps polls from queueing duplicate renders; it expires so a lost job gets requeued.
+    if not purchase.license_file:
+        if cache.add(f'license_pdf_pending:{purchase.pk}', True, LICENSE_PDF_PENDING_TIMEOUT):
+            enqueue(build_license_pdfs, [purchase.pk])
+        return Response(
+            {'status': 'generating', 'message': 'License certificate is being generated'},
+            status=status.HTTP_202_ACCEPTED
+        )
 
-        response = FileResponse(
-            open(purchase.license_file.path, 'rb'),
+    try:
+        return _serve_file(
+            purchase.license_file,
+            as_attachment=True,
+            filename=f"License_{purchase.track.title}_{purchase.license_type.name}.pdf",
             content_type='application/pdf'
         )
-
-        filename = f"License_{purchase.track.title}_{purchase.license_type.name}.pdf"
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-
-        return response
-
-    except Exception as e:
+    except FileNotFoundError:
         return Response(
-            {'error': str(e)},
-            status=status.HTTP_400_BAD_REQUEST
+            {'error': 'License certificate not found'},
+            status=status.HTTP_404_NOT_FOUND
         )
+
@@ -7,10 +7,6 @@ from django.core.exceptions import ObjectDoesNotExist
 from django.db import models
 from django.http import Http404
 
-from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
-from django.http import Http404
-
 
 class UserManager(BaseUserManager):
     def get_public_id(self, public_id):
@@ -88,6 +84,15 @@ class User(AbstractBaseUser, PermissionsMixin):
     REQUIRED_FIELDS = ['username']
     objects = UserManager()
 
+    class Meta:
+        indexes = [
+            # Matches the non-superuser predicate of the user listing
+            models.Index(
+                fields=['is_superuser'], name='users_nonsuper_idx',
+                condition=models.Q(is_superuser=False)
+            ),
+        ]
+
     def __str__(self):
         return f"{self.email} ({self.get_role_display()})"
 
@@ -102,39 +107,3 @@ class User(AbstractBaseUser, PermissionsMixin):
     @property
     def is_buyer(self):
         return self.role == 'buyer'
-
-        try:
-            instance = self.get(public_id=public_id)
-            return instance
-        except (ObjectDoesNotExist, ValueError, TypeError):
-            raise Http404
-
-    def create_user(self, username, email, password=None, **kwargs):
-        if username is None:
-            raise TypeError('User must add username')
-        if email is None:
-            raise TypeError('User must add email')
-        if password is None:
-            raise TypeError('User must add password')
-
-        user = self.model(username=username, email=self.normalize_email(email), **kwargs)
-        user.set_password(password)
-        user.save(using=self.db)
-        return user
-
-    def create_superuser(self, username, email, password=None, **kwargs):
-        if username is None:
-            raise TypeError('Superuser must provide the username')
-        if email is None:
-            raise TypeError('Superuser must have an email address')
-        if password is None:
-            raise TypeError('Superuser must have a password')
-
-        user = self.create_user(username=username, email=self.normalize_email(email), password=password, **kwargs)
-        user.is_staff = True
-        user.is_superuser = True
-        user.save(using=self._db)
-        return user
-
-
-
@@ -1,8 +1,22 @@
+from copy import copy
+
 from rest_framework import serializers
 from apps.users.models import User
 
 
-class UserSerializer(serializers.ModelSerializer):
+class CachedFieldsModelSerializer(serializers.ModelSerializer):
+    """ModelSerializer that introspects the model once per class and hands out shallow copies"""
+    _fields_cache = {}
+
+    def get_fields(self):
+        cls = type(self)
+        if cls not in self._fields_cache:
+            self._fields_cache[cls] = super().get_fields()
+        # Each instance binds its own copies, so field_name/parent never leak between requests
+        return {name: copy(field) for name, field in self._fields_cache[cls].items()}
+
+
+class UserSerializer(CachedFieldsModelSerializer):
     id = serializers.UUIDField(source="public_id", read_only=True, format="hex")
     full_name = serializers.ReadOnlyField()
 
@@ -13,4 +27,4 @@ class UserSerializer(serializers.ModelSerializer):
             'role', 'bio', 'profile_image', 'spotify_link', 'soundcloud_link',
             'instagram_link', 'is_verified', 'created_at', 'updated'
         ]
-        read_only_fields = ['is_verified', 'created_at', 'updated']
\ No newline at end of file
+        read_only_fields = ['is_verified', 'created_at', 'updated']
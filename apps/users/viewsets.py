@@ -1,6 +1,7 @@
+import uuid
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
-from rest_framework import viewsets
+from rest_framework import status, viewsets
 from rest_framework import generics
 from apps.users.serializers import UserSerializer
 from apps.users.models import User
@@ -14,10 +15,20 @@ class UserViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         if self.request.user.is_superuser:
             return User.objects.all()
-        return User.objects.exclude(is_superuser=True)
+        # filter(False) rather than exclude(True) so Postgres can use users_nonsuper_idx
+        return User.objects.filter(is_superuser=False)
 
     def get_object(self):
-        obj = User.objects.get_public_id(self.kwargs['pk'])
+        # JWT auth has already loaded the requesting user; don't fetch it again. Parse the pk so
+        # hex ids (as UserSerializer renders them) match as well as dashed ones.
+        try:
+            is_current_user = uuid.UUID(self.kwargs['pk']) == self.request.user.public_id
+        except ValueError:
+            is_current_user = False
+        if is_current_user:
+            obj = self.request.user
+        else:
+            obj = User.objects.get_public_id(self.kwargs['pk'])
         self.check_object_permissions(self.request, obj)
         return obj
 
@@ -41,7 +41,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
-# Database configuration
+# Flags N+1 regressions with an X-Query-Snitch-Detected header; DEBUG is on everywhere, so gate on the environment
+if ENVIRONMENT == 'development':
+    MIDDLEWARE.append('apps.middleware.QuerySnitchMiddleware')
+
+# Database configuration - keep connections open between requests instead of reconnecting each time
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+
 if ENVIRONMENT == 'development':
     DATABASES = {
         'default': {
@@ -50,13 +56,29 @@ if ENVIRONMENT == 'development':
             'USER': config('DB_USER'), 
             'PASSWORD': config('DB_PASSWORD'),
             'HOST': config('DB_HOST'),
-            'PORT': config('DB_PORT')
+            'PORT': config('DB_PORT'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
         }
     }
 else:
     import dj_database_url
     DATABASES = {
-        'default': dj_database_url.parse(config('DATABASE_URL'))
+        'default': dj_database_url.parse(
+            config('DATABASE_URL'),
+            conn_max_age=DB_CONN_MAX_AGE,
+            conn_health_checks=True
+        )
+    }
+
+# Cache configuration - shared Redis when available, per-process memory otherwise
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
     }
 
 # Cloudinary configuration - SINGLE, CLEAN CONFIG
@@ -96,7 +118,11 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
 ROOT_URLCONF = 'server.urls'
@@ -144,4 +170,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Stripe configuration
 STRIPE_PUBLISHABLE_KEY = config('STRIPE_PUBLISHABLE_KEY')
-STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY')
\ No newline at end of file
+STRIPE_SECRET_KEY = config('STRIPE_SECRET_KEY')
+# Optional: without it the webhook endpoint refuses every event (503) and purchases are
+# recorded by the client's confirm call only
+STRIPE_WEBHOOK_SECRET = config('STRIPE_WEBHOOK_SECRET', default='')